@@ -1,5 +1,13 @@
+import heapq
+import threading
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
-from typing import Any, Dict, List
+from functools import lru_cache
+from typing import Any, Dict, List, Tuple
+
+from cachetools import TTLCache
+from cachetools.keys import hashkey
 
 from datadog_api_client.v2.api.logs_api import LogsApi
 from datadog_api_client.v2.model.logs_query_filter import LogsQueryFilter
@@ -8,6 +16,14 @@ from datadog_api_client.v2.model.logs_list_request import LogsListRequest
 
 from datadog_config import DatadogConfig, utc_now, iso, make_client
 
+# 같은 쿼리/구간의 집계를 짧은 시간 안에 반복 조회하는 경우가 많아 결과를 잠시 보관합니다.
+# 항목 하나에 버킷 목록 전체를 (service, count) 튜플로 저장합니다.
+_AGG_CACHE: TTLCache = TTLCache(maxsize=512, ttl=30)
+_AGG_LOCK = threading.RLock()
+
+# 에이전트는 상위 3개 서비스의 샘플만 프롬프트에 넣으므로, 근거 로그도 그 행들만 조회합니다.
+SAMPLE_ROWS = 3
+
 # ----------------------------
 # Core: Logs Aggregate (Top N by group)
 # ----------------------------
@@ -53,6 +69,38 @@ def aggregate_top(
     return buckets
 
 
+def _top_service_pairs(
+    api: LogsApi,
+    query: str,
+    time_from: datetime,
+    time_to: datetime,
+    limit: int,
+    service_facet: str,
+) -> Tuple[Tuple[str, int], ...]:
+    """
+    (service, count) 튜플 목록을 count desc로 반환합니다. (TTL 캐시 경유)
+    - 시각은 분 단위로 잘라 캐시 키로 사용하므로, TTL 안의 거의 동시 호출은 같은 결과를 공유합니다.
+    """
+    key = hashkey(query, iso(time_from)[:16], iso(time_to)[:16], service_facet, limit)
+    with _AGG_LOCK:
+        pairs: Tuple[Tuple[str, int], ...] | None = _AGG_CACHE.get(key)
+
+    if pairs is None:
+        rows = aggregate_top(
+            api=api,
+            query=query,
+            time_from=time_from,
+            time_to=time_to,
+            facet=service_facet,
+            limit=limit,
+        )
+        pairs = tuple((r["key"], r["count"]) for r in rows)
+        with _AGG_LOCK:
+            _AGG_CACHE[key] = pairs
+
+    return pairs
+
+
 def aggregate_top_services(
     api: LogsApi,
     query: str,
@@ -64,15 +112,23 @@ def aggregate_top_services(
     """
     Returns list of {service, count} sorted by count desc.
     """
-    rows = aggregate_top(
-        api=api,
-        query=query,
-        time_from=time_from,
-        time_to=time_to,
-        facet=service_facet,
-        limit=limit,
-    )
-    return [{"service": r["key"], "count": r["count"]} for r in rows]
+    pairs = _top_service_pairs(api, query, time_from, time_to, limit, service_facet)
+    # 호출자가 row에 samples 등을 덧붙이므로 매번 새 dict를 만들어 반환합니다.
+    return [{"service": s, "count": c} for s, c in pairs]
+
+
+def aggregate_top_services_map(
+    api: LogsApi,
+    query: str,
+    time_from: datetime,
+    time_to: datetime,
+    limit: int = 10,
+    service_facet: str = "service",
+) -> Dict[str, int]:
+    """
+    Returns {service: count}. 비교 기준(이전 구간)처럼 조회만 하는 경우에 사용합니다.
+    """
+    return dict(_top_service_pairs(api, query, time_from, time_to, limit, service_facet))
 
 
 # ----------------------------
@@ -81,44 +137,72 @@ def aggregate_top_services(
 
 def _extract_message(item) -> str:
     """
-    LogsListResponse에서 message 후보를 최대한 안전하게 추출합니다.
+    LogsListResponse에서 message 후보를 최대한 안전하게 추출합니다. (최대 300자)
     환경마다 message 경로가 달라서 방어적으로 구현합니다.
+    - 대부분 attributes.message가 있으므로 직접 접근하고 없을 때만 예외로 분기합니다.
     """
-    if not item or not getattr(item, "attributes", None):
+    try:
+        attrs = item.attributes
+    except AttributeError:
+        return "(no attributes)"
+    if not attrs:
         return "(no attributes)"
-
-    attrs = item.attributes
 
     # 1) 가장 흔한 경로: attributes.message
-    msg = getattr(attrs, "message", None)
+    try:
+        msg = attrs.message
+    except AttributeError:
+        msg = None
     if msg:
-        return str(msg)
+        return str(msg)[:300]
 
-    # 2) 일부는 attributes.attributes["message"]
+    # 2) 일부는 attributes.attributes["message"] 또는 다른 흔한 키들
     nested = getattr(attrs, "attributes", None)
     if isinstance(nested, dict):
-        if "message" in nested and nested["message"]:
-            return str(nested["message"])
-        # 다른 흔한 키들도 후보로
-        for k in ("msg", "log", "error", "exception"):
-            if k in nested and nested[k]:
-                return str(nested[k])
+        for k in ("message", "msg", "log", "error", "exception"):
+            v = nested.get(k)
+            if v:
+                return str(v)[:300]
 
     return "(message field not found)"
 
 
-def sample_logs_for_service(
+def _extract_service(item) -> str | None:
+    """
+    로그 항목의 서비스명을 추출합니다. attributes.service가 없으면 tags의 service:<name>을 사용합니다.
+    """
+    attrs = getattr(item, "attributes", None)
+    if not attrs:
+        return None
+
+    svc = getattr(attrs, "service", None)
+    if svc:
+        return str(svc)
+
+    for tag in (getattr(attrs, "tags", None) or []):
+        if isinstance(tag, str) and tag.startswith("service:"):
+            return tag[len("service:"):]
+    return None
+
+
+def _collect_samples(
     api: LogsApi,
     base_query: str,
-    service_name: str,
+    services: List[str],
     time_from: datetime,
     time_to: datetime,
-    limit: int = 2,
-) -> List[str]:
+    per_service: int,
+    out: Dict[str, List[str]],
+) -> bool:
     """
-    Return short message snippets for evidence.
+    services의 로그를 list_logs 1회로 받아 out에 서비스별로 채웁니다.
+    - 반환: 페이지가 가득 찼는지 여부 (가득 찼다면 아직 못 받은 로그가 더 있을 수 있음)
     """
-    q = f"{base_query} service:{service_name}"
+    quoted = " OR ".join('"{}"'.format(s.replace('"', '\\"')) for s in services)
+    q = f"{base_query} service:({quoted})"
+
+    # 특정 서비스 로그가 몰려도 나머지 서비스 샘플이 채워지도록 여유 있게 받습니다.
+    page_limit = min(len(services) * per_service * 3, 1000)
 
     req = LogsListRequest(
         filter=LogsQueryFilter(
@@ -127,26 +211,93 @@ def sample_logs_for_service(
             query=q,
         ),
         sort=LogsSort.TIMESTAMP_DESCENDING,
-        page={"limit": limit},
+        page={"limit": page_limit},
     )
 
-    resp = api.list_logs(body=req)
+    items = api.list_logs(body=req).data or []
 
-    out: List[str] = []
-    for item in (resp.data or []):
-        out.append(_extract_message(item)[:300])
+    wanted = set(services)
+    filled = 0
+    for item in items:
+        svc = _extract_service(item)
+        if svc not in wanted or len(out[svc]) >= per_service:
+            continue
+        out[svc].append(_extract_message(item))
+        if len(out[svc]) == per_service:
+            filled += 1
+            if filled == len(wanted):
+                break
 
-    return out
+    return len(items) >= page_limit
 
 
+def sample_logs_for_services(
+    api: LogsApi,
+    base_query: str,
+    services: List[str],
+    time_from: datetime,
+    time_to: datetime,
+    per_service: int = 2,
+) -> Dict[str, List[str]]:
+    """
+    여러 서비스의 근거 로그를 한 번의 list_logs 호출로 가져와 서비스별로 나눕니다.
+    - 반환: {service: [message, ...]} (서비스당 최대 per_service개)
+    - 로그가 많은 서비스가 페이지를 독차지해 샘플이 모자란 서비스가 남으면,
+      그 서비스들만으로 다시 조회합니다. (조회마다 최소 1개 서비스가 채워지므로 최대 N회)
+    """
+    out: Dict[str, List[str]] = defaultdict(list)
+    pending = list(services)
+    while pending:
+        # 재조회 시 같은 최신 로그가 다시 오므로, 대상 서비스의 버킷은 비우고 새로 채웁니다.
+        for svc in pending:
+            out[svc] = []
+        page_full = _collect_samples(api, base_query, pending, time_from, time_to, per_service, out)
 
+        short = [svc for svc in pending if len(out[svc]) < per_service]
+        # 페이지가 덜 찼다면 구간 내 로그를 모두 본 것이므로 더 조회할 필요가 없습니다.
+        if not page_full or len(short) == len(pending):
+            break
+        pending = short
+
+    return {svc: msgs for svc, msgs in out.items() if msgs}
+
+
+def attach_samples(
+    api: LogsApi,
+    base_query: str,
+    rows: List[Dict[str, Any]],
+    time_from: datetime,
+    time_to: datetime,
+    limit: int = 2,
+) -> None:
+    """
+    rows의 각 서비스 샘플 로그를 한 번의 조회로 가져와 row["samples"]에 채웁니다.
+    """
+    if not rows:
+        return
+
+    samples = sample_logs_for_services(
+        api, base_query, [row["service"] for row in rows], time_from, time_to, per_service=limit
+    )
+    for row in rows:
+        row["samples"] = samples.get(row["service"], [])
+
+
+
+@lru_cache(maxsize=64)
+def _cluster_prefix(cluster: str) -> str:
+    # 서비스가 없으면 서비스 facet group_by가 비어 보일 수 있어 service:*를 유지합니다.
+    # 한 세션에서 cluster는 대부분 고정이므로 이 조각은 cluster별로 한 번만 만듭니다.
+    return f"kube_cluster_name:{cluster} service:*"
+
+
+@lru_cache(maxsize=256)
 def build_log_query(
     cluster: str,
     status: str = "error",
     namespace: str | None = None,
 ) -> str:
-    parts = []
-    parts.append(f"kube_cluster_name:{cluster}")
+    parts = [_cluster_prefix(cluster)]
 
     if status:
         parts.append(f"status:{status}")
@@ -154,9 +305,6 @@ def build_log_query(
     if namespace:
         parts.append(f"kube_namespace:{namespace}")
 
-    # 서비스가 없으면 서비스 facet group_by가 비어 보일 수 있어 service:*를 유지하는 것도 가능
-    parts.append("service:*")
-
     return " ".join(parts)
 
 
@@ -172,6 +320,7 @@ def current_error_services(
     namespace: str | None = None,
     window_minutes: int = 15,
     limit: int = 10,
+    include_samples: bool = True,
 ) -> Dict[str, Any]:
 
     now = utc_now()
@@ -182,8 +331,8 @@ def current_error_services(
 
     top = aggregate_top_services(api, base, t_from, now, limit=limit)
 
-    for row in top:
-        row["samples"] = sample_logs_for_service(api, base, row["service"], t_from, now, limit=2)
+    if include_samples:
+        attach_samples(api, base, top[:SAMPLE_ROWS], t_from, now, limit=2)
 
     return {
         "summary": f"최근 {window_minutes}분 동안 에러가 발생한 서비스 Top {limit}",
@@ -206,6 +355,7 @@ def increasing_error_services(
     limit: int = 10,
     min_delta: int = 10,
     min_ratio: float = 2.0,
+    include_samples: bool = False,
 ) -> Dict[str, Any]:
 
     now = utc_now()
@@ -216,10 +366,11 @@ def increasing_error_services(
     base = build_log_query(cluster=cluster, status=status, namespace=namespace)
 
     # 집계는 넉넉히 받아서(예: 1000) MCP/서버에서 계산하는 게 안정적입니다.
-    cur = aggregate_top_services(api, base, cur_from, now, limit=1000)
-    prev = aggregate_top_services(api, base, prev_from, prev_to, limit=1000)
-
-    prev_map = {r["service"]: r["count"] for r in prev}
+    # 이전 구간 집계를 먼저 백그라운드로 띄워두고, 현재 구간은 호출 스레드에서 바로 조회합니다.
+    with ThreadPoolExecutor(max_workers=1) as ex:
+        prev_fut = ex.submit(aggregate_top_services_map, api, base, prev_from, prev_to, 1000)
+        cur = aggregate_top_services(api, base, cur_from, now, limit=1000)
+        prev_map = prev_fut.result()
 
     rows: List[Dict[str, Any]] = []
     for r in cur:
@@ -241,11 +392,11 @@ def increasing_error_services(
                 }
             )
 
-    rows.sort(key=lambda x: (x["ratio"], x["delta"]), reverse=True)
-    rows = rows[:limit]
+    # 기준을 통과한 후보 중 상위 limit개만 필요하므로 전체 정렬 대신 부분 선택합니다.
+    rows = heapq.nlargest(limit, rows, key=lambda x: (x["ratio"], x["delta"]))
 
-    for row in rows:
-        row["samples"] = sample_logs_for_service(api, base, row["service"], cur_from, now, limit=2)
+    if include_samples:
+        attach_samples(api, base, rows[:SAMPLE_ROWS], cur_from, now, limit=2)
 
     return {
         "summary": f"최근 {window_minutes}분 동안 에러가 증가한 서비스 Top {limit}",
@@ -5,7 +5,11 @@ from typing import Optional
 
 from datadog_api_client import ApiClient, Configuration
 
-@dataclass(frozen=True)
+# 우선순위: DD_SITE(도메인) -> DD_API_HOST(풀 URL or 도메인)
+_DEFAULT_SITE: Optional[str] = os.getenv("DD_SITE") or os.getenv("DD_API_HOST")
+
+
+@dataclass(frozen=True, slots=True)
 class DatadogConfig:
     """
     환경변수 규칙
@@ -13,8 +17,7 @@ class DatadogConfig:
     - 또는 DD_API_HOST: https://api.datadoghq.com 같은 풀 URL도 허용(하위 호환)
     - DD_API_KEY / DD_APP_KEY: 필수
     """
-    # 우선순위: DD_SITE(도메인) -> DD_API_HOST(풀 URL or 도메인)
-    site: Optional[str] = os.getenv("DD_SITE") or os.getenv("DD_API_HOST")
+    site: Optional[str] = _DEFAULT_SITE
     api_key: Optional[str] = os.getenv("DD_API_KEY")
     app_key: Optional[str] = os.getenv("DD_APP_KEY")
 
@@ -52,6 +55,15 @@ def _normalize_host(site: str) -> str:
     return f"https://api.{s}".rstrip("/")
 
 
+# env는 프로세스 동안 바뀌지 않으므로 기본 host는 import 시 1회만 정규화합니다.
+_HOST = _normalize_host(_DEFAULT_SITE or "datadoghq.com")
+
+# 공유 ApiClient의 urllib3 커넥션 풀 크기. (SDK 기본값은 cpu_count * 5)
+# mcp_server 핸들러 스레드(MCP_THREAD_LIMIT)마다 increasing 호출이 이전 구간 조회 스레드를 1개 더 쓰므로
+# 2배로 잡아, 풀보다 많은 동시 요청이 연결을 새로 맺고 버리지 않도록 합니다.
+_POOL_MAXSIZE = int(os.getenv("MCP_THREAD_LIMIT", "64")) * 2
+
+
 def make_client(cfg: DatadogConfig) -> ApiClient:
     # 필수 env 검증 (여기서 바로 실패시키는 게 디버깅에 유리합니다)
     if not cfg.api_key:
@@ -59,10 +71,14 @@ def make_client(cfg: DatadogConfig) -> ApiClient:
     if not cfg.app_key:
         raise RuntimeError("DD_APP_KEY 환경변수가 비어있습니다.")
 
-    host = _normalize_host(cfg.site or "datadoghq.com")
+    if cfg.site == _DEFAULT_SITE:
+        host = _HOST
+    else:
+        host = _normalize_host(cfg.site or "datadoghq.com")
 
     configuration = Configuration(
         host=host,
         api_key={"apiKeyAuth": cfg.api_key, "appKeyAuth": cfg.app_key},
     )
+    configuration.connection_pool_maxsize = _POOL_MAXSIZE
     return ApiClient(configuration)
@@ -1,6 +1,14 @@
 # mcp_server.py
+import asyncio
 import os
-from fastapi import FastAPI, Header, HTTPException
+from contextlib import asynccontextmanager
+
+import anyio.to_thread
+from fastapi import FastAPI, Header, HTTPException, Request
+from fastapi.responses import ORJSONResponse
+from fastapi.concurrency import run_in_threadpool
+from fastapi.middleware.gzip import GZipMiddleware
+from pydantic import ValidationError
 from datadog_api_client.v2.api.logs_api import LogsApi
 
 from datadog_config import DatadogConfig, make_client
@@ -8,8 +16,32 @@ from datadog_api import current_error_services, increasing_error_services
 
 from models.current_error_services_request import CurrentErrorServicesRequest
 from models.increasing_error_services_request import IncreasingErrorServicesRequest
+from models.batch_request import BatchRequest
+
+# run_in_threadpool이 사용하는 anyio 스레드 한도 (기본 40)
+MCP_THREAD_LIMIT = int(os.getenv("MCP_THREAD_LIMIT", "64"))
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # 핸들러는 동기 SDK 호출을 스레드풀로 넘기므로, 동시 처리량은 이 한도에 비례합니다.
+    anyio.to_thread.current_default_thread_limiter().total_tokens = MCP_THREAD_LIMIT
+
+    # ApiClient(urllib3 커넥션 풀)를 프로세스 수명 동안 재사용해 요청마다 TCP/TLS를 새로 맺지 않습니다.
+    cfg = DatadogConfig()
+    with make_client(cfg) as client:
+        app.state.client = client
+        app.state.api = LogsApi(client)
+        yield
 
-app = FastAPI(title="Datadog MCP Server", version="0.1.0")
+
+app = FastAPI(
+    title="Datadog MCP Server",
+    version="0.1.0",
+    default_response_class=ORJSONResponse,
+    lifespan=lifespan,
+)
+# 서비스 목록/샘플 로그 응답은 JSON이라 압축률이 높습니다. 작은 응답은 그대로 보냅니다.
+app.add_middleware(GZipMiddleware, minimum_size=1000)
 
 def _check_api_key(x_api_key: str | None):
     expected = os.getenv("MCP_API_KEY", "")
@@ -21,44 +53,84 @@ def _check_api_key(x_api_key: str | None):
 def health():
     return {"status": "ok"}
 
+def _run_current(api: LogsApi, req: CurrentErrorServicesRequest):
+    return current_error_services(
+        api=api,
+        cluster=req.cluster,
+        status=req.status,
+        namespace=req.namespace,
+        window_minutes=req.window_minutes,
+        limit=req.limit,
+        include_samples=req.include_samples,
+    )
+
+
+def _run_increasing(api: LogsApi, req: IncreasingErrorServicesRequest):
+    return increasing_error_services(
+        api=api,
+        cluster=req.cluster,
+        status=req.status,
+        namespace=req.namespace,
+        window_minutes=req.window_minutes,
+        limit=req.limit,
+        min_delta=req.min_delta,
+        min_ratio=req.min_ratio,
+        include_samples=req.include_samples,
+    )
+
+
+_BATCH_TOOLS = {
+    "current_error_services": (CurrentErrorServicesRequest, _run_current),
+    "increasing_error_services": (IncreasingErrorServicesRequest, _run_increasing),
+}
+
+
 @app.post("/tools/current-error-services")
-def tool_current_error_services(
+async def tool_current_error_services(
+    request: Request,
     req: CurrentErrorServicesRequest,
     x_api_key: str | None = Header(default=None, alias="X-API-Key"),
 ):
     _check_api_key(x_api_key)
 
-    cfg = DatadogConfig()
-    with make_client(cfg) as client:
-        api = LogsApi(client)
-        return current_error_services(
-            api=api,
-            cluster=req.cluster,
-            status=req.status,
-            namespace=req.namespace,
-            window_minutes=req.window_minutes,
-            limit=req.limit,
-        )
+    # datadog_api_client는 동기 SDK이므로 이벤트 루프를 막지 않도록 스레드풀로 넘깁니다.
+    return await run_in_threadpool(_run_current, request.app.state.api, req)
 
 
 @app.post("/tools/increasing-error-services")
-def tool_increasing_error_services(
+async def tool_increasing_error_services(
+    request: Request,
     req: IncreasingErrorServicesRequest,
     x_api_key: str | None = Header(default=None, alias="X-API-Key"),
 ):
     _check_api_key(x_api_key)
 
-    cfg = DatadogConfig()
-    with make_client(cfg) as client:
-        api = LogsApi(client)
-        return increasing_error_services(
-            api=api,
-            cluster=req.cluster,
-            status=req.status,
-            namespace=req.namespace,
-            window_minutes=req.window_minutes,
-            limit=req.limit,
-            min_delta=req.min_delta,
-            min_ratio=req.min_ratio,
-        )
+    return await run_in_threadpool(_run_increasing, request.app.state.api, req)
+
+
+@app.post("/tools/batch")
+async def tool_batch(
+    request: Request,
+    req: BatchRequest,
+    x_api_key: str | None = Header(default=None, alias="X-API-Key"),
+):
+    """
+    여러 도구 호출을 한 요청으로 받아 동시에 실행하고, 입력 순서대로 결과를 반환합니다.
+    """
+    _check_api_key(x_api_key)
+
+    # 모든 호출을 먼저 검증합니다. (중간에 422가 나도 이미 만든 코루틴이 버려지지 않도록)
+    validated = []
+    for i, call in enumerate(req.calls):
+        model, runner = _BATCH_TOOLS[call.tool]
+        try:
+            validated.append((runner, model(**call.args)))
+        except ValidationError as e:
+            raise HTTPException(
+                status_code=422,
+                detail={"call": i, "tool": call.tool, "errors": e.errors(include_url=False)},
+            )
 
+    api = request.app.state.api
+    jobs = [run_in_threadpool(runner, api, tool_req) for runner, tool_req in validated]
+    return {"results": await asyncio.gather(*jobs)}
@@ -0,0 +1,10 @@
+from pydantic import BaseModel, Field
+from typing import Any, Dict, List, Literal
+
+class ToolCall(BaseModel):
+    tool: Literal["current_error_services", "increasing_error_services"]
+    args: Dict[str, Any] = Field(default_factory=dict)
+
+class BatchRequest(BaseModel):
+    # 한 번의 왕복으로 여러 도구를 실행 (각 args는 도구별 request 모델로 다시 검증)
+    calls: List[ToolCall] = Field(..., min_length=1, max_length=4)
@@ -11,3 +11,6 @@ class CurrentErrorServicesRequest(BaseModel):
 
     # ✅ 기존대로
     limit: int = Field(default=10, ge=1, le=20)
+
+    # 근거 로그 샘플 조회 여부 (카운트만 필요하면 False로 API 호출을 줄일 수 있음)
+    include_samples: bool = Field(default=True)
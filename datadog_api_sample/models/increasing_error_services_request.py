@@ -12,3 +12,6 @@ class IncreasingErrorServicesRequest(BaseModel):
     limit: int = Field(default=10, ge=1, le=20)
     min_delta: int = Field(default=10, ge=1)
     min_ratio: float = Field(default=2.0, ge=1.0, le=100.0)
+
+    # 증가 판단은 ratio/delta로 충분하므로 기본값은 샘플 미조회
+    include_samples: bool = Field(default=False)
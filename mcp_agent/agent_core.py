@@ -3,17 +3,28 @@ import os
 import re
 from typing import Any, Dict, List, Optional, Tuple
 
+import orjson
 import requests
 from dotenv import load_dotenv
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
-from prompts import TOOL_SPEC
-from tools_client import current_error_services, increasing_error_services
+from prompts import TOOL_SPEC, TOOLS_SPEC
+from tools_client import batch
 
 # Load .env early (safe even in container)
 load_dotenv()
 
 OLLAMA_URL = os.getenv("OLLAMA_URL", "http://localhost:11434").rstrip("/")
 OLLAMA_MODEL = os.getenv("OLLAMA_MODEL", "qwen2.5:7b")
+# 모델이 메모리에 남아 있어야 고정 system prompt(LANG_SPEC/TOOL_SPEC) 프리픽스의 KV 캐시가 재사용됩니다.
+OLLAMA_KEEP_ALIVE = os.getenv("OLLAMA_KEEP_ALIVE", "30m")
+
+# Ollama 호출은 keep-alive 세션을 재사용해 매 턴 TCP 연결을 새로 맺지 않습니다.
+_SESSION = requests.Session()
+_ADAPTER = HTTPAdapter(pool_connections=4, pool_maxsize=8, max_retries=Retry(total=2, backoff_factor=0.3))
+_SESSION.mount("http://", _ADAPTER)
+_SESSION.mount("https://", _ADAPTER)
 
 # Safety limits (server-side enforcement)
 MAX_TOOL_CALLS = int(os.getenv("AGENT_MAX_TOOL_CALLS", "2"))
@@ -25,6 +36,10 @@ WINDOW_MAX = int(os.getenv("AGENT_WINDOW_MAX", "20160"))
 LIMIT_MIN = int(os.getenv("AGENT_LIMIT_MIN", "1"))
 LIMIT_MAX = int(os.getenv("AGENT_LIMIT_MAX", "20"))
 
+# 한도 초과/무효 tool_call이 이만큼 반복되면 루프를 끝내고 오류 final을 반환합니다.
+# (tools는 KV 캐시를 위해 항상 보내므로, 도구 호출을 멈추지 않는 모델에 대한 상한)
+MAX_REJECTED_CALLS = int(os.getenv("AGENT_MAX_REJECTED_CALLS", "2"))
+
 # ✅ Language enforcement retries
 MAX_LANG_RETRY = int(os.getenv("AGENT_LANG_RETRY", "3"))
 
@@ -42,6 +57,33 @@ LANG_SPEC = """
 - 비한국어(특히 중국어/한자)가 포함되면 즉시 잘못된 출력입니다. 절대로 포함하지 마십시오.
 """.strip()
 
+# 질문 파싱/언어 검사 정규식 (모듈 로드 시 1회 컴파일)
+# namespace / cluster / 기간 힌트를 한 번의 스캔으로 찾도록 named group 하나로 합칩니다.
+_HINT_RE = re.compile(
+    r"\b(?P<ns>[a-z0-9][a-z0-9\-]*)\s*(?:네임스페이스|namespace)\b"
+    r"|\b(?P<cluster>[a-z0-9][a-z0-9\-]*)\s*(?:클러스터|cluster)\b"
+    r"|최근\s*(?P<n>\d+)\s*(?P<unit>주일|주|일|시간|분)",
+    re.IGNORECASE,
+)
+# "현재 에러 서비스와 증가한 서비스" / "증가 서비스 및 지금 상황"처럼 두 의도를 접속 표현으로 잇는 질문
+_BOTH_INTENT_RE = re.compile(
+    r"(?:현재|지금)[^?.\n]*?(?:와|과|및|그리고|랑|하고|,)[^?.\n]*증가"
+    r"|증가[^?.\n]*?(?:와|과|및|그리고|랑|하고|,)[^?.\n]*(?:현재|지금)"
+)
+# Chinese Han characters (CJK Unified Ideographs)
+_CJK_RE = re.compile(r"[\u4e00-\u9fff]")
+# U+4E00..U+9FFF는 UTF-8에서 선두 바이트 0xE4..0xE9로 시작합니다. (한글 음절은 0xEA..0xED)
+_CJK_LEAD_BYTES = bytes(range(0xE4, 0xEA))
+
+
+def _dumps(obj: Any, indent: bool = False) -> str:
+    # orjson은 UTF-8로 바로 직렬화하므로 ensure_ascii=False와 같은 결과를 더 빠르게 냅니다.
+    try:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2 if indent else None).decode()
+    except TypeError:
+        # orjson은 64비트 범위를 넘는 정수(LLM이 만든 JSON에 드물게 등장)를 직렬화하지 못합니다.
+        return json.dumps(obj, ensure_ascii=False, indent=2 if indent else None)
+
 
 def clamp_int(v: int, lo: int, hi: int) -> int:
     return max(lo, min(hi, v))
@@ -52,127 +94,212 @@ def clamp_float(v: float, lo: float, hi: float) -> float:
 
 
 def llm_chat(messages: List[Dict[str, str]]) -> str:
+    """
+    Ollama 응답을 스트리밍으로 받으며 다음 경우 나머지 토큰을 기다리지 않고 끊습니다.
+    - 네이티브 tool_calls 수신: 응답이 끝나면 모든 호출을 기존 tool_call JSON 텍스트로 바꿔 반환
+    - 한자(CJK)가 등장: 어차피 재요청 대상이므로 즉시 반환 (호출 측 재시도 로직이 처리)
+    - 첫 JSON 객체가 완성됨: 뒤따르는 잡문은 사용하지 않으므로 즉시 반환
+    """
     payload = {
         "model": OLLAMA_MODEL,
         "messages": messages,
-        "stream": False,
+        "stream": True,
+        "keep_alive": OLLAMA_KEEP_ALIVE,
         "options": {"temperature": 0.2},
+        # tools는 system prompt 맨 앞에 렌더링되므로, 프리픽스 KV 캐시를 위해 호출 한도와 무관하게 항상 보냅니다.
+        # (한도 초과 호출은 run_agent의 "Tool call limit reached" 분기가 막습니다)
+        "tools": TOOLS_SPEC,
     }
-    r = requests.post(f"{OLLAMA_URL}/api/chat", json=payload, timeout=90)
-    r.raise_for_status()
-    data = r.json()
-    return data["message"]["content"]
+    parts: List[str] = []
+    native_calls: List[Dict[str, Any]] = []
+    with _SESSION.post(f"{OLLAMA_URL}/api/chat", json=payload, timeout=90, stream=True) as r:
+        r.raise_for_status()
+        for line in r.iter_lines():
+            if not line:
+                continue
+            chunk = orjson.loads(line)
+            if "error" in chunk:
+                raise RuntimeError(f"Ollama error: {chunk['error']}")
+
+            msg = chunk.get("message") or {}
+            # 한 메시지에 두 도구를 함께 호출하는 경우가 많아 모두 모읍니다. (run_agent가 batch로 묶어 실행)
+            native_calls.extend(msg.get("tool_calls") or ())
+
+            piece = msg.get("content") or ""
+            if piece:
+                parts.append(piece)
+                if contains_cjk(piece):
+                    break
+                if "}" in piece and _json_object_complete("".join(parts)):
+                    break
+
+            if chunk.get("done"):
+                break
+    if native_calls:
+        return "\n".join(_tool_call_text(tc) for tc in native_calls)
+    return "".join(parts)
+
+
+def _tool_call_text(tool_call: Dict[str, Any]) -> str:
+    """
+    Ollama 네이티브 tool_calls 항목을 run_agent가 처리하는 tool_call JSON 텍스트로 바꿉니다.
+    (arguments는 보통 dict지만, 일부 모델/버전은 JSON 문자열로 줍니다.)
+    """
+    fn = tool_call.get("function") or {}
+    args = fn.get("arguments") or {}
+    if isinstance(args, str):
+        args = extract_first_json_object(args) or {}
+    return _dumps({"action": "tool_call", "tool": fn.get("name"), "args": args})
 
 
 # ----------------------------
 # JSON extraction (robust)
 # ----------------------------
 
+_JSON_DECODER = json.JSONDecoder()
+
+
 def extract_first_json_object(text: str) -> Optional[Dict[str, Any]]:
     """
     LLM이 JSON 앞뒤에 잡문을 붙여도, 첫 번째 JSON 객체만 안정적으로 추출합니다.
-    - 단순 정규식 {.*}는 깨지기 쉬워서, brace counter 방식으로 추출합니다.
+    - 각 "{" 위치에서 JSONDecoder.raw_decode(C 구현)로 파싱을 시도하므로
+      문자열 안의 중괄호도 올바르게 처리됩니다.
     """
     if not text:
         return None
 
+    i = text.find("{")
+    while i != -1:
+        try:
+            obj, _ = _JSON_DECODER.raw_decode(text, i)
+            if isinstance(obj, dict):
+                return obj
+        except json.JSONDecodeError:
+            pass
+        i = text.find("{", i + 1)
+    return None
+
+
+def extract_json_objects(text: str) -> List[Dict[str, Any]]:
+    """
+    텍스트에 나란히 들어 있는 JSON 객체를 순서대로 모두 추출합니다.
+    (한 응답에 tool_call 여러 개를 연달아/배열로 내는 경우를 묶어 실행하기 위함)
+    """
+    objs: List[Dict[str, Any]] = []
+    if not text:
+        return objs
+
+    i = text.find("{")
+    while i != -1:
+        try:
+            obj, end = _JSON_DECODER.raw_decode(text, i)
+        except json.JSONDecodeError:
+            i = text.find("{", i + 1)
+            continue
+        if isinstance(obj, dict):
+            objs.append(obj)
+        i = text.find("{", end)
+    return objs
+
+
+def _json_object_complete(text: str) -> bool:
+    """
+    스트리밍 중간 버퍼에서 첫 "{"부터 시작하는 JSON 객체가 완성됐는지 확인합니다.
+    (중첩 객체만 먼저 닫힌 상태를 완성으로 오인하지 않도록 첫 "{"에서만 파싱합니다.)
+    - 완성된 객체가 tool_call이면, 바로 이어서 나오는 독립 tool_call도 함께 받도록
+      구분자(공백/쉼표/"[") 뒤에 다음 "{"가 오는 동안은 계속 기다립니다.
+    """
     start = text.find("{")
     if start < 0:
-        return None
-
-    depth = 0
-    for i in range(start, len(text)):
-        ch = text[i]
-        if ch == "{":
-            depth += 1
-        elif ch == "}":
-            depth -= 1
-            if depth == 0:
-                candidate = text[start:i + 1]
-                try:
-                    return json.loads(candidate)
-                except Exception:
-                    return None
-    return None
+        return False
+    while True:
+        try:
+            obj, end = _JSON_DECODER.raw_decode(text, start)
+        except json.JSONDecodeError:
+            return False
+        if not isinstance(obj, dict) or obj.get("action") != "tool_call":
+            return True
+        rest = text[end:].lstrip(" \t\r\n,[")
+        if not rest:
+            return False
+        if rest[0] != "{":
+            return True
+        start = len(text) - len(rest)
 
 
 # ----------------------------
 # Language enforcement helpers
 # ----------------------------
 
+def _has_cjk_lead_byte(b: bytes) -> bool:
+    # translate(None, delete)는 C에서 한 번에 처리되며, 지워진 바이트가 있으면 길이가 달라집니다.
+    return len(b.translate(None, _CJK_LEAD_BYTES)) != len(b)
+
+
 def contains_cjk(text: str) -> bool:
-    # Chinese Han characters (CJK Unified Ideographs)
-    return bool(re.search(r"[\u4e00-\u9fff]", text))
+    # 대부분의 출력은 한자가 없으므로 바이트 단위 선검사로 빠르게 False를 반환합니다.
+    # 선두 바이트 0xE4에는 U+4000..U+4DFF도 포함되므로, 걸린 경우에만 정규식으로 확정합니다.
+    if not _has_cjk_lead_byte(text.encode("utf-8", "ignore")):
+        return False
+    return _CJK_RE.search(text) is not None
+
+
+_NON_KOREAN_NOTICE = "한국어로만 출력해야 하나, 모델 출력에 비한국어 문구가 포함되어 일부 내용을 생략했습니다."
+
+
+def _sanitize_value(x: Any) -> Any:
+    if isinstance(x, str):
+        return _NON_KOREAN_NOTICE if contains_cjk(x) else x
+    if isinstance(x, dict):
+        return {k: _sanitize_value(v) for k, v in x.items()}
+    if isinstance(x, list):
+        return [_sanitize_value(v) for v in x]
+    return x
 
 
 def sanitize_korean_only(obj: Dict[str, Any]) -> Dict[str, Any]:
     """
     최종 방어막:
     - final JSON 내부에 한자(중국어)가 남아 있으면 해당 문자열을 한국어 안내 문구로 치환
+    - 호출 측에서 이미 contains_cjk로 한자 포함을 확인한 뒤 부르므로 별도 선검사는 하지 않습니다.
     """
-    def _fix_str(s: str) -> str:
-        if not isinstance(s, str):
-            return s
-        if contains_cjk(s):
-            return "한국어로만 출력해야 하나, 모델 출력에 비한국어 문구가 포함되어 일부 내용을 생략했습니다."
-        return s
-
-    def _walk(x: Any) -> Any:
-        if isinstance(x, dict):
-            return {k: _walk(v) for k, v in x.items()}
-        if isinstance(x, list):
-            return [_walk(v) for v in x]
-        if isinstance(x, str):
-            return _fix_str(x)
-        return x
-
-    return _walk(obj)
+    return _sanitize_value(obj)
 
 
 # ----------------------------
 # Question parsing (deterministic)
 # ----------------------------
 
-def extract_namespace_from_question(question: str) -> Optional[str]:
-    # 예: "dtslm 네임스페이스", "dtslm namespace"
-    m = re.search(r"\b([a-z0-9][a-z0-9\-]*)\s*(네임스페이스|namespace)\b", question, flags=re.IGNORECASE)
-    if not m:
-        return None
-    return m.group(1).strip()
-
-
-def extract_cluster_from_question(question: str) -> Optional[str]:
-    # 예: "marios-prd-eks 클러스터", "marios-stg-eks cluster"
-    m = re.search(r"\b([a-z0-9][a-z0-9\-]*)\s*(클러스터|cluster)\b", question, flags=re.IGNORECASE)
-    if not m:
-        return None
-    return m.group(1).strip()
+_WINDOW_UNIT_MINUTES = {"주일": 7 * 24 * 60, "주": 7 * 24 * 60, "일": 24 * 60, "시간": 60, "분": 1}
 
 
-def parse_window_minutes_ko(question: str) -> Optional[int]:
+def extract_hints_from_question(question: str) -> Tuple[Optional[str], Optional[str], Optional[int]]:
     """
-    예: "최근 2주일", "최근 14일", "최근 48시간", "최근 30분"
-    공백이 섞여도 동작하도록 처리합니다.
+    질문에서 (cluster, namespace, window_minutes) 힌트를 한 번에 추출합니다. 각 항목은 첫 매치만 사용합니다.
+    예: "marios-prd-eks 클러스터", "dtslm 네임스페이스", "최근 2주일", "최근 48시간", "최근 30분"
     """
-    q = question.replace(" ", "")
+    cluster: Optional[str] = None
+    namespace: Optional[str] = None
+    window: Optional[int] = None
 
-    # "최근2주일간", "최근2주", "최근14일간", "최근48시간", "최근30분"
-    m = re.search(r"최근(\d+)(주일|주|일|시간|분)", q)
-    if not m:
-        return None
+    for m in _HINT_RE.finditer(question):
+        if m.group("ns") is not None:
+            if namespace is None:
+                namespace = m.group("ns").strip()
+        elif m.group("cluster") is not None:
+            if cluster is None:
+                cluster = m.group("cluster").strip()
+        elif window is None:
+            window = int(m.group("n")) * _WINDOW_UNIT_MINUTES[m.group("unit")]
+
+    return cluster, namespace, window
 
-    n = int(m.group(1))
-    unit = m.group(2)
-
-    if unit in ("주일", "주"):
-        return n * 7 * 24 * 60
-    if unit == "일":
-        return n * 24 * 60
-    if unit == "시간":
-        return n * 60
-    if unit == "분":
-        return n
-    return None
+
+_STATUS_HINTS = (
+    ("warn", ("warn", "경고")),
+    ("info", ("info", "정보")),
+    ("debug", ("debug", "디버그")),
+)
 
 
 def choose_status_from_question(question: str) -> str:
@@ -182,12 +309,10 @@ def choose_status_from_question(question: str) -> str:
     - 사용자가 명시적으로 warn/info/debug를 말한 경우만 반영(선택)
     """
     q = question.lower()
-    if "warn" in q or "warning" in q or "경고" in question:
-        return "warn"
-    if "info" in q or "정보" in question:
-        return "info"
-    if "debug" in q or "디버그" in question:
-        return "debug"
+    for status, tokens in _STATUS_HINTS:
+        for token in tokens:
+            if token in q:
+                return status
     return "error"
 
 
@@ -230,6 +355,11 @@ def validate_and_normalize_call(call: Dict[str, Any]) -> Dict[str, Any]:
         namespace = namespace.strip()
         args["namespace"] = namespace if namespace else None
 
+    # include_samples: optional (없으면 도구별 서버 기본값)
+    include_samples = args.get("include_samples")
+    if include_samples is not None and not isinstance(include_samples, bool):
+        raise ValueError("include_samples must be a boolean or null")
+
     window = int(args.get("window_minutes", 15))
     limit = int(args.get("limit", 10))
     args["window_minutes"] = clamp_int(window, WINDOW_MIN, WINDOW_MAX)
@@ -247,23 +377,37 @@ def validate_and_normalize_call(call: Dict[str, Any]) -> Dict[str, Any]:
 # Tool runner
 # ----------------------------
 
-def run_tool(tool: str, args: Dict[str, Any]) -> Dict[str, Any]:
-    if tool == "current_error_services":
-        return current_error_services(**args)
-    if tool == "increasing_error_services":
-        return increasing_error_services(**args)
-    raise ValueError("Unknown tool")
+def run_tools_batched(calls: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    서로 독립적인 tool_call들을 MCP 서버 batch 호출 1회로 실행하고, 입력 순서대로 결과를 반환합니다.
+    """
+    return batch([(c["tool"], c["args"]) for c in calls])
+
+
+def wants_both_tools(question: str) -> bool:
+    """
+    질문이 '현재 에러'와 '에러 증가'를 함께 묻는지 키워드로 판단합니다.
+    - "현재"/"지금"은 대개 시간 부사("지금 에러가 증가하는…")이고, "발생"도 "에러 발생이 증가한…"처럼
+      증가 질문에 흔히 쓰이므로, 두 의도가 접속 표현(와/과/및/그리고…)으로 이어질 때만 True
+    """
+    if "증가" not in question:
+        return False
+    return _BOTH_INTENT_RE.search(question) is not None
+
+
+_COMPACT_FIELDS = ("service", "count", "previous", "current", "delta", "ratio")
 
 
 def compact_tool_result(tool: str, result: Dict[str, Any]) -> Dict[str, Any]:
     services = result.get("services") or []
     top = services[:5]
     out = []
-    for s in top:
-        row = {k: s.get(k) for k in ("service", "count", "previous", "current", "delta", "ratio")}
-        samples = s.get("samples") or []
+    for i, s in enumerate(top):
+        row = {k: s[k] for k in _COMPACT_FIELDS if k in s}
+        # 근거 샘플은 상위 3개 서비스만 짧게 전달해 프롬프트를 줄입니다.
+        samples = (s.get("samples") or []) if i < 3 else []
         if samples:
-            row["sample"] = str(samples[0])[:220]
+            row["sample"] = str(samples[0])[:120]
         out.append(row)
 
     return {
@@ -275,6 +419,51 @@ def compact_tool_result(tool: str, result: Dict[str, Any]) -> Dict[str, Any]:
     }
 
 
+def _apply_question_hints(
+    obj: Dict[str, Any],
+    cluster: Optional[str],
+    namespace: Optional[str],
+    window: Optional[int],
+    status: Optional[str],
+) -> Dict[str, Any]:
+    """
+    LLM이 빼먹을 때를 대비해 질문 기반 힌트로 tool_call args를 보정 주입합니다.
+    """
+    args_obj = obj.get("args") or {}
+    if cluster and (not isinstance(args_obj.get("cluster"), str) or not args_obj.get("cluster", "").strip()):
+        args_obj["cluster"] = cluster
+    if namespace and args_obj.get("namespace") in (None, "", "null"):
+        args_obj["namespace"] = namespace
+    if window:
+        args_obj["window_minutes"] = window
+    if status and (args_obj.get("status") is None):
+        args_obj["status"] = status
+    obj["args"] = args_obj
+    return obj
+
+
+def _rejected_calls_final(trace: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    tool_call 거절이 반복될 때, 그때까지 실행된 도구 결과 요약으로 final을 만듭니다.
+    """
+    findings = [
+        t["result"]["summary"]
+        for t in trace
+        if t["type"] == "tool_result" and t["result"].get("summary")
+    ]
+    return {
+        "action": "final",
+        "title": "도구 호출 반복 중단",
+        "summary": "LLM이 허용되지 않는 도구 호출을 반복해 분석을 중단했습니다. 지금까지의 조회 결과만 제공합니다.",
+        "findings": findings,
+        "next_actions": [
+            "include_trace=true로 다시 호출해 도구 호출 내역을 확인합니다.",
+            "질문에 클러스터/기간/네임스페이스를 명확히 적어 재시도합니다.",
+            "AGENT_MAX_TOOL_CALLS 설정이 질문에 충분한지 확인합니다.",
+        ],
+    }
+
+
 # ----------------------------
 # Agent main loop
 # ----------------------------
@@ -292,15 +481,39 @@ def run_agent(question: str) -> Tuple[Dict[str, Any], List[Dict[str, Any]]]:
     ]
 
     tool_calls = 0
+    rejected_calls = 0
     lang_retry = 0
     trace: List[Dict[str, Any]] = []
 
     # 질문 기반 deterministic hints
-    hinted_cluster = extract_cluster_from_question(question)
-    hinted_namespace = extract_namespace_from_question(question)
-    hinted_window = parse_window_minutes_ko(question)
+    hinted_cluster, hinted_namespace, hinted_window = extract_hints_from_question(question)
     hinted_status = choose_status_from_question(question)
 
+    # ✅ 두 도구가 모두 필요한 질문이면 LLM 왕복 없이 두 도구를 batch 1회로 함께 실행합니다.
+    # 두 호출 모두 한도에 계산하므로, LLM이 드릴다운할 호출이 최소 1회 남을 때(한도 3 이상)만 사용합니다.
+    if hinted_cluster and MAX_TOOL_CALLS >= 3 and wants_both_tools(question):
+        calls = []
+        for tool in ("current_error_services", "increasing_error_services"):
+            args_obj = {"cluster": hinted_cluster, "namespace": hinted_namespace, "status": hinted_status}
+            if hinted_window:
+                args_obj["window_minutes"] = hinted_window
+            calls.append(validate_and_normalize_call({"action": "tool_call", "tool": tool, "args": args_obj}))
+
+        tool_calls += len(calls)
+        results = run_tools_batched(calls)
+
+        for call, result in zip(calls, results):
+            compact = compact_tool_result(call["tool"], result)
+            trace.append({"type": "tool_call", "call": call})
+            trace.append({"type": "tool_result", "result": compact})
+            messages.append({"role": "assistant", "content": _dumps(call)})
+            messages.append({"role": "user", "content": "Tool result:\n" + _dumps(compact, indent=True)})
+
+        messages[-1]["content"] += (
+            "\n\n두 도구 결과가 모두 준비되었습니다. 추가 드릴다운이 꼭 필요하면 tool_call을 하고, "
+            "아니면 action=final로 한국어 JSON만 출력하십시오."
+        )
+
     while True:
         text = llm_chat(messages)
 
@@ -341,7 +554,7 @@ def run_agent(question: str) -> Tuple[Dict[str, Any], List[Dict[str, Any]]]:
         action = obj.get("action")
 
         if action == "final":
-            dump = json.dumps(obj, ensure_ascii=False)
+            dump = _dumps(obj)
 
             # final 단계 한자 포함 시 재생성/정화
             if contains_cjk(dump):
@@ -371,52 +584,65 @@ def run_agent(question: str) -> Tuple[Dict[str, Any], List[Dict[str, Any]]]:
 
         if action == "tool_call":
             if tool_calls >= MAX_TOOL_CALLS:
-                messages.append({"role": "assistant", "content": json.dumps(obj, ensure_ascii=False)})
-                messages.append({"role": "user", "content": "Tool call limit reached. Output action=final JSON now (Korean-only, JSON-only)."})
                 trace.append({"type": "tool_call_rejected", "reason": "limit_reached", "call": obj})
+                rejected_calls += 1
+                if rejected_calls > MAX_REJECTED_CALLS:
+                    final = _rejected_calls_final(trace)
+                    trace.append({"type": "final_forced", "reason": "limit_reached", "content": final})
+                    return final, trace
+
+                messages.append({"role": "assistant", "content": _dumps(obj)})
+                messages.append({"role": "user", "content": "Tool call limit reached. Output action=final JSON now (Korean-only, JSON-only)."})
                 continue
 
-            # ✅ LLM이 빼먹을 때를 대비해 질문 기반으로 args를 보정 주입
-            obj.setdefault("args", {})
-            args_obj = obj["args"] or {}
-            if hinted_cluster and (not isinstance(args_obj.get("cluster"), str) or not args_obj.get("cluster", "").strip()):
-                args_obj["cluster"] = hinted_cluster
-            if hinted_namespace and args_obj.get("namespace") in (None, "", "null"):
-                args_obj["namespace"] = hinted_namespace
-            if hinted_window:
-                args_obj["window_minutes"] = hinted_window
-            if hinted_status and (args_obj.get("status") is None):
-                args_obj["status"] = hinted_status
-            obj["args"] = args_obj
-
-            try:
-                call = validate_and_normalize_call(obj)
-            except ValueError as e:
-                messages.append({"role": "assistant", "content": json.dumps(obj, ensure_ascii=False)})
+            # ✅ 한 응답에 tool_call이 여러 개면 서로의 결과가 필요 없는 독립 호출이므로,
+            #    남은 호출 한도 안에서 batch 1회로 묶어 실행합니다.
+            requested = [o for o in extract_json_objects(text) if o.get("action") == "tool_call"] or [obj]
+            budget = MAX_TOOL_CALLS - tool_calls
+            for extra in requested[budget:]:
+                trace.append({"type": "tool_call_rejected", "reason": "limit_reached", "call": extra})
+
+            calls: List[Dict[str, Any]] = []
+            invalid: List[Tuple[Dict[str, Any], ValueError]] = []
+            for o in requested[:budget]:
+                _apply_question_hints(o, hinted_cluster, hinted_namespace, hinted_window, hinted_status)
+                try:
+                    calls.append(validate_and_normalize_call(o))
+                except ValueError as e:
+                    invalid.append((o, e))
+                    trace.append({"type": "tool_call_invalid", "error": str(e), "call": o})
+
+            if not calls:
+                rejected_calls += 1
+                if rejected_calls > MAX_REJECTED_CALLS:
+                    final = _rejected_calls_final(trace)
+                    trace.append({"type": "final_forced", "reason": "tool_call_invalid", "content": final})
+                    return final, trace
+
+                o, e = invalid[0]
+                messages.append({"role": "assistant", "content": _dumps(o)})
                 messages.append({
                     "role": "user",
                     "content": f"Tool call is invalid: {str(e)}. 사용자에게 필요한 추가 정보를 한국어로 질문하고 action=final JSON으로 종료하십시오.",
                 })
-                trace.append({"type": "tool_call_invalid", "error": str(e), "call": obj})
                 continue
 
-            tool = call["tool"]
-            args = call["args"]
+            tool_calls += len(calls)
+            results = run_tools_batched(calls)
 
-            tool_calls += 1
-            result = run_tool(tool, args)
-            compact = compact_tool_result(tool, result)
+            for call, result in zip(calls, results):
+                compact = compact_tool_result(call["tool"], result)
 
-            trace.append({"type": "tool_call", "call": call})
-            trace.append({"type": "tool_result", "result": compact})
+                trace.append({"type": "tool_call", "call": call})
+                trace.append({"type": "tool_result", "result": compact})
 
-            messages.append({"role": "assistant", "content": json.dumps(call, ensure_ascii=False)})
-            messages.append({
-                "role": "user",
-                "content": "Tool result:\n"
-                           + json.dumps(compact, ensure_ascii=False, indent=2)
-                           + "\n\n다음 단계 결정: 추가 드릴다운이 도움이 되면 또 다른 tool_call을 하십시오. 아니면 action=final로 한국어 JSON만 출력하십시오.",
-            })
+                messages.append({"role": "assistant", "content": _dumps(call)})
+                messages.append({"role": "user", "content": "Tool result:\n" + _dumps(compact, indent=True)})
+
+            messages[-1]["content"] += (
+                "\n\n다음 단계 결정: 추가 드릴다운이 도움이 되면 또 다른 tool_call을 하십시오. "
+                "아니면 action=final로 한국어 JSON만 출력하십시오."
+            )
             continue
 
         final = {
@@ -1,15 +1,28 @@
+import json
 import os
 import traceback
 from typing import Any, Dict, Optional
 
 from fastapi import FastAPI, Header, HTTPException
+from fastapi.responses import ORJSONResponse
 from pydantic import BaseModel, Field
 
 from agent_core import run_agent
 
 AGENT_API_KEY = os.getenv("AGENT_API_KEY", "")  # optional
 
-app = FastAPI(title="MCP Agent API", version="0.1.2")
+
+class AgentJSONResponse(ORJSONResponse):
+    # result에는 LLM이 만든 final 객체가 그대로 들어가므로, orjson이 못 다루는
+    # 64비트 초과 정수가 섞일 수 있습니다. 이때만 json.dumps로 렌더링합니다.
+    def render(self, content: Any) -> bytes:
+        try:
+            return super().render(content)
+        except TypeError:
+            return json.dumps(content, ensure_ascii=False).encode("utf-8")
+
+
+app = FastAPI(title="MCP Agent API", version="0.1.2", default_response_class=AgentJSONResponse)
 
 class AskRequest(BaseModel):
     question: str = Field(..., min_length=1)
@@ -1,78 +1,63 @@
 # prompts.py
 
+# TOOL_SPEC은 사용자별 값을 끼워 넣지 않는 고정 문자열이어야 합니다. (f-string/format 금지)
+# 프롬프트 앞부분이 바이트 단위로 동일해야 제공자 측 프롬프트 캐시(prefix KV 캐시)가 적중합니다.
 TOOL_SPEC = """
-당신은 Datadog 로그 분석을 위해 '도구(tool)'를 호출할 수 있는 에이전트입니다.
+반드시 JSON 객체 1개만 출력합니다. 설명/마크다운/코드블록 금지, 모든 자연어 값은 한국어로만 작성합니다.
+Datadog 로그 분석 에이전트입니다. action은 tool_call|final, 정의된 키만 사용합니다.
+데이터가 필요하면 제공된 도구(tools)를 호출합니다. 대화 기록의 도구 호출은 아래 tool_call 형식으로 표시됩니다.
 
-[최우선 규칙]
-- 모든 자연어 출력은 반드시 한국어로만 작성합니다. (중국어/한자/영어/일본어 사용 금지)
-- 반드시 JSON 객체 1개만 출력합니다. JSON 외 텍스트(설명/마크다운/코드블록) 금지.
-- 아래 스키마 외의 키를 추가하지 않습니다.
+tool_call: {"action":"tool_call","tool":"<tools의 name>","args":{...}}
+final: {"action":"final","title":"str","summary":"str","findings":["str"],"next_actions":["str"]}
 
-가능한 action은 2가지입니다.
-1) tool_call
-2) final
-
-------------------------------------------------------------
-1) tool_call 형식
-------------------------------------------------------------
-다음 JSON 형태로만 도구 호출을 요청합니다.
-
-{
-  "action": "tool_call",
-  "tool": "<tool_name>",
-  "args": { ... }
-}
-
-- tool_name 허용 목록:
-  - "current_error_services"
-  - "increasing_error_services"
-
-- args 규칙:
-  - cluster: string (필수, 사용자 질문에 명시된 값만 사용. 추측/기본값 금지)
-  - window_minutes: int (선택, 기본 15)
-  - limit: int (선택, 기본 10)
-  
-[namespace 추출 규칙]
-- 사용자가 "<네임스페이스> 네임스페이스" 또는 "<네임스페이스> namespace"라고 말하면,
-  args.namespace에 해당 값을 반드시 넣으십시오.
-  예) "dtslm 네임스페이스" -> "namespace": "dtslm"
-- 사용자가 네임스페이스를 언급하지 않으면 args.namespace는 넣지 않거나 null로 두십시오.
-
-- increasing_error_services 추가 args:
-  - min_delta: int (선택, 기본 10)
-  - min_ratio: float (선택, 기본 2.0)
-
-------------------------------------------------------------
-2) final 형식
-------------------------------------------------------------
-도구 호출이 더 이상 필요 없으면 반드시 아래 JSON 형태로 종료합니다.
+- cluster는 질문에 명시된 값만 사용(추측 금지).
+- 질문에 "<값> 네임스페이스|namespace"가 있으면 namespace 인자에 넣고, 없으면 생략.
+- next_actions는 실행 가능한 짧은 문장 3~5개.
+- 드릴다운이 꼭 필요할 때만 다시 도구를 호출하고, 아니면 final.
+""".strip()
 
-{
-  "action": "final",
-  "title": "<짧은 제목(한국어)>",
-  "summary": "<요약(한국어)>",
-  "findings": [
-    "<관찰/근거/수치(한국어)>"
-  ],
-  "next_actions": [
-    "<다음 액션(한국어)>"
-  ]
+# 도구 정의는 프롬프트 문장 대신 Ollama /api/chat의 tools 파라미터(OpenAI function 형식)로 전달합니다.
+# 인자 문법은 모델/런타임이 스키마로 강제하므로 TOOL_SPEC에는 출력 규칙과 (대화 기록용) tool_call 형식만 남깁니다.
+# (범위 보정은 기존대로 agent_core.validate_and_normalize_call이 담당합니다.)
+_COMMON_PROPS = {
+    "cluster": {"type": "string", "description": "kube_cluster_name (질문에 명시된 값)"},
+    "window_minutes": {"type": "integer", "default": 15},
+    "limit": {"type": "integer", "default": 10},
+    "status": {"type": "string", "default": "error"},
+    "namespace": {"type": "string", "description": "kube_namespace (질문에 있을 때만)"},
 }
 
-[final 규칙]
-- title/summary/findings/next_actions는 반드시 한국어로만 작성합니다.
-- next_actions는 3~5개, 실행 가능한 짧은 문장으로 작성합니다.
-- 시스템 제약/오류 안내가 필요하면 한국어로 작성합니다.
-  (예: "시간 창이 너무 큽니다. window_minutes를 더 작게 지정해 주세요.")
-
-------------------------------------------------------------
-전략(권장)
-------------------------------------------------------------
-- "최근 에러가 발생하는 서비스" 성격이면 current_error_services를 호출합니다.
-- "에러가 증가하는 서비스" 성격이면 increasing_error_services를 호출합니다.
-- 도구 결과를 받은 뒤, 추가 드릴다운이 꼭 필요할 때만 다음 tool_call을 수행하고,
-  그렇지 않으면 final로 종료합니다.
-- 질문에 '네임스페이스'가 포함되면 반드시 namespace를 tool_call args에 포함하십시오.
-
-이제 사용자의 질문에 대해 위 규칙을 준수하여 응답하십시오.
-""".strip()
+TOOLS_SPEC = [
+    {
+        "type": "function",
+        "function": {
+            "name": "current_error_services",
+            "description": "최근 구간에 에러가 발생한 서비스 Top N",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    **_COMMON_PROPS,
+                    "include_samples": {"type": "boolean", "default": True, "description": "카운트만 필요하면 false"},
+                },
+                "required": ["cluster"],
+            },
+        },
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "increasing_error_services",
+            "description": "직전 구간 대비 에러가 증가한 서비스 Top N",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    **_COMMON_PROPS,
+                    "min_delta": {"type": "integer", "default": 10},
+                    "min_ratio": {"type": "number", "default": 2.0},
+                    "include_samples": {"type": "boolean", "default": False, "description": "근거 로그가 필요하면 true"},
+                },
+                "required": ["cluster"],
+            },
+        },
+    },
+]
@@ -1,15 +1,221 @@
 import os
-import requests
-from typing import Any, Dict, Optional
+import threading
+from types import MappingProxyType
+
+import httpx
+import orjson
+import urllib3
+from cachetools import TTLCache
+from typing import Any, Dict, List, Optional, Tuple
+from urllib3.util.retry import Retry
 
 MCP_URL = os.getenv("MCP_URL", "http://datadog_api:8080").rstrip("/")
 MCP_API_KEY = os.getenv("MCP_API_KEY", "")
 
-def _headers() -> Dict[str, str]:
-    h = {"Content-Type": "application/json"}
-    if MCP_API_KEY:
-        h["X-API-Key"] = MCP_API_KEY
-    return h
+# 모든 도구 호출은 /tools/batch 한 엔드포인트로 보냅니다. (여러 호출을 1회 왕복으로 묶을 수 있음)
+_PATH_BATCH = "/tools/batch"
+_URL_BATCH = f"{MCP_URL}{_PATH_BATCH}"
+# 서버 BatchRequest.calls의 max_length와 같아야 합니다. (넘으면 422)
+BATCH_MAX_CALLS = 4
+
+# 헤더와 payload 골격은 import 시 한 번만 만들어 두고 호출마다 재사용합니다.
+_HEADERS = MappingProxyType({
+    "Content-Type": "application/json",
+    # 응답(서비스 목록/샘플)은 서버에서 gzip으로 압축되며, urllib3/httpx가 투명하게 해제합니다.
+    "Accept-Encoding": "gzip, deflate",
+    **({"X-API-Key": MCP_API_KEY} if MCP_API_KEY else {}),
+})
+_CUR_TMPL: Dict[str, Any] = {
+    "cluster": None,
+    "window_minutes": 15,
+    "limit": 10,
+    "status": "error",
+}
+_INC_TMPL: Dict[str, Any] = {
+    **_CUR_TMPL,
+    "min_delta": 10,
+    "min_ratio": 2.0,
+}
+
+# MCP 서버 호출은 urllib3 PoolManager 하나를 재사용합니다. (엔드포인트가 하나라 requests 래퍼 없이 직접 호출)
+# 두 도구 모두 조회 전용이라 POST라도 게이트웨이 오류(502/503/504)와 연결 실패는 재시도해도 안전합니다.
+# 읽기 타임아웃은 재시도하지 않습니다. (느린 장기간 집계를 최대 3번 다시 돌리게 되므로)
+_POOL = urllib3.PoolManager(
+    num_pools=4,
+    maxsize=32,
+    block=False,
+    headers={**_HEADERS, "Connection": "keep-alive"},
+    retries=Retry(
+        total=2,
+        connect=2,
+        read=False,
+        backoff_factor=0.2,
+        status_forcelist=[502, 503, 504],
+        allowed_methods=frozenset({"POST"}),
+        raise_on_status=False,
+    ),
+)
+# connect/read: 죽은 사이드카는 빨리 실패시키고, 조회 자체는 충분히 기다립니다.
+_TIMEOUT = urllib3.Timeout(connect=3.05, read=30)
+
+# 비동기 호출자용 클라이언트: 두 도구를 asyncio.gather로 겹쳐 호출할 수 있습니다.
+# 커넥션 풀이 이벤트 루프에 묶이므로 하나의 (장수명) 루프에서만 사용해야 하며,
+# 동기 경로만 쓰는 프로세스에서는 만들지 않도록 첫 비동기 호출 때 생성합니다.
+_ACLIENT: Optional[httpx.AsyncClient] = None
+
+
+def _aclient() -> httpx.AsyncClient:
+    global _ACLIENT
+    if _ACLIENT is None:
+        _ACLIENT = httpx.AsyncClient(
+            base_url=MCP_URL,
+            headers=_HEADERS,
+            timeout=httpx.Timeout(30.0, connect=3.0),
+            limits=httpx.Limits(max_keepalive_connections=16, max_connections=32),
+        )
+    return _ACLIENT
+
+# 두 도구 모두 조회 전용이라, 짧은 세션 안에서 같은 인자로 반복되는 호출은 응답을 재사용합니다.
+# 호출자가 결과를 수정해도 캐시가 오염되지 않도록 직렬화된 bytes로 보관하고, 적중 시 새로 역직렬화합니다.
+_CACHE: TTLCache = TTLCache(maxsize=256, ttl=45)
+_LOCK = threading.Lock()
+
+
+def _cache_key(tool: str, args: Dict[str, Any]) -> Tuple[Any, ...]:
+    return (tool, tuple(sorted(args.items())))
+
+
+def _cache_get(key: Tuple[Any, ...]) -> Optional[Dict[str, Any]]:
+    with _LOCK:
+        raw = _CACHE.get(key)
+    return None if raw is None else orjson.loads(raw)
+
+
+def _cache_put(key: Tuple[Any, ...], value: Dict[str, Any]) -> None:
+    raw = orjson.dumps(value)
+    with _LOCK:
+        _CACHE[key] = raw
+
+
+def invalidate(tool: Optional[str] = None) -> None:
+    """
+    캐시를 비웁니다. tool을 주면 해당 도구("current_error_services" 등)의 항목만 지웁니다.
+    """
+    with _LOCK:
+        if tool is None:
+            _CACHE.clear()
+            return
+        for key in [k for k in _CACHE.keys() if k[0] == tool]:
+            _CACHE.pop(key, None)
+
+
+def _current_payload(
+    cluster: str,
+    window_minutes: int,
+    limit: int,
+    status: str,
+    namespace: Optional[str],
+    include_samples: Optional[bool],
+) -> Dict[str, Any]:
+    p = _CUR_TMPL.copy()
+    p["cluster"] = cluster
+    p["window_minutes"] = window_minutes
+    p["limit"] = limit
+    p["status"] = status
+    if namespace is not None:
+        p["namespace"] = namespace
+    if include_samples is not None:
+        p["include_samples"] = include_samples
+    return p
+
+
+def _increasing_payload(
+    cluster: str,
+    window_minutes: int,
+    limit: int,
+    min_delta: int,
+    min_ratio: float,
+    status: str,
+    namespace: Optional[str],
+    include_samples: Optional[bool],
+) -> Dict[str, Any]:
+    p = _INC_TMPL.copy()
+    p["cluster"] = cluster
+    p["window_minutes"] = window_minutes
+    p["limit"] = limit
+    p["min_delta"] = min_delta
+    p["min_ratio"] = min_ratio
+    p["status"] = status
+    if namespace is not None:
+        p["namespace"] = namespace
+    if include_samples is not None:
+        p["include_samples"] = include_samples
+    return p
+
+
+def _prepare_batch(
+    calls: List[Tuple[str, Dict[str, Any]]],
+) -> Tuple[List[Optional[Dict[str, Any]]], List[Tuple[List[int], bytes]]]:
+    """
+    캐시 적중은 바로 채우고, 미적중 호출만 batch 요청 body로 만듭니다.
+    서버의 호출 수 상한(BATCH_MAX_CALLS)을 넘으면 여러 요청으로 나눕니다.
+    - 반환: (results, [(miss_indexes, body), ...])
+    """
+    results: List[Optional[Dict[str, Any]]] = []
+    misses: List[int] = []
+    for i, (tool, args) in enumerate(calls):
+        cached = _cache_get(_cache_key(tool, args))
+        results.append(cached)
+        if cached is None:
+            misses.append(i)
+
+    chunks = []
+    for start in range(0, len(misses), BATCH_MAX_CALLS):
+        idxs = misses[start:start + BATCH_MAX_CALLS]
+        body = orjson.dumps({"calls": [{"tool": calls[i][0], "args": calls[i][1]} for i in idxs]})
+        chunks.append((idxs, body))
+    return results, chunks
+
+
+def _fill_batch(
+    calls: List[Tuple[str, Dict[str, Any]]],
+    results: List[Optional[Dict[str, Any]]],
+    misses: List[int],
+    content: bytes,
+) -> List[Dict[str, Any]]:
+    for i, result in zip(misses, orjson.loads(content)["results"]):
+        _cache_put(_cache_key(*calls[i]), result)
+        results[i] = result
+    return results
+
+
+def batch(calls: List[Tuple[str, Dict[str, Any]]]) -> List[Dict[str, Any]]:
+    """
+    [(tool, args), ...]를 POST /tools/batch로 실행하고, 입력 순서대로 결과를 반환합니다.
+    (BATCH_MAX_CALLS개 이하면 1회 왕복) args 값이 None인 키는 서버 기본값을 쓰도록 보내지 않습니다.
+    """
+    calls = [(tool, {k: v for k, v in args.items() if v is not None}) for tool, args in calls]
+    results, chunks = _prepare_batch(calls)
+
+    for idxs, body in chunks:
+        r = _POOL.request("POST", _URL_BATCH, body=body, timeout=_TIMEOUT)
+        if r.status >= 400:
+            raise RuntimeError(f"MCP {_PATH_BATCH} 호출 실패: HTTP {r.status} {r.data[:200]!r}")
+        _fill_batch(calls, results, idxs, r.data)
+    return results
+
+
+async def abatch(calls: List[Tuple[str, Dict[str, Any]]]) -> List[Dict[str, Any]]:
+    calls = [(tool, {k: v for k, v in args.items() if v is not None}) for tool, args in calls]
+    results, chunks = _prepare_batch(calls)
+
+    for idxs, body in chunks:
+        r = await _aclient().post(_PATH_BATCH, content=body)
+        if r.status_code >= 400:
+            raise RuntimeError(f"MCP {_PATH_BATCH} 호출 실패: HTTP {r.status_code} {r.content[:200]!r}")
+        _fill_batch(calls, results, idxs, r.content)
+    return results
+
 
 def current_error_services(
     cluster: str,
@@ -17,17 +223,11 @@ def current_error_services(
     limit: int = 10,
     status: str = "error",
     namespace: Optional[str] = None,
+    include_samples: Optional[bool] = None,
 ) -> Dict[str, Any]:
-    payload = {
-        "cluster": cluster,
-        "window_minutes": window_minutes,
-        "limit": limit,
-        "status": status,
-        "namespace": namespace,
-    }
-    r = requests.post(f"{MCP_URL}/tools/current-error-services", headers=_headers(), json=payload, timeout=30)
-    r.raise_for_status()
-    return r.json()
+    payload = _current_payload(cluster, window_minutes, limit, status, namespace, include_samples)
+    return batch([("current_error_services", payload)])[0]
+
 
 def increasing_error_services(
     cluster: str,
@@ -37,16 +237,40 @@ def increasing_error_services(
     min_ratio: float = 2.0,
     status: str = "error",
     namespace: Optional[str] = None,
+    include_samples: Optional[bool] = None,
+) -> Dict[str, Any]:
+    payload = _increasing_payload(cluster, window_minutes, limit, min_delta, min_ratio, status, namespace, include_samples)
+    return batch([("increasing_error_services", payload)])[0]
+
+
+async def acurrent_error_services(
+    cluster: str,
+    window_minutes: int = 15,
+    limit: int = 10,
+    status: str = "error",
+    namespace: Optional[str] = None,
+    include_samples: Optional[bool] = None,
+) -> Dict[str, Any]:
+    payload = _current_payload(cluster, window_minutes, limit, status, namespace, include_samples)
+    return (await abatch([("current_error_services", payload)]))[0]
+
+
+async def aincreasing_error_services(
+    cluster: str,
+    window_minutes: int = 15,
+    limit: int = 10,
+    min_delta: int = 10,
+    min_ratio: float = 2.0,
+    status: str = "error",
+    namespace: Optional[str] = None,
+    include_samples: Optional[bool] = None,
 ) -> Dict[str, Any]:
-    payload = {
-        "cluster": cluster,
-        "window_minutes": window_minutes,
-        "limit": limit,
-        "min_delta": min_delta,
-        "min_ratio": min_ratio,
-        "status": status,
-        "namespace": namespace,
-    }
-    r = requests.post(f"{MCP_URL}/tools/increasing-error-services", headers=_headers(), json=payload, timeout=30)
-    r.raise_for_status()
-    return r.json()
+    payload = _increasing_payload(cluster, window_minutes, limit, min_delta, min_ratio, status, namespace, include_samples)
+    return (await abatch([("increasing_error_services", payload)]))[0]
+
+
+async def aclose() -> None:
+    global _ACLIENT
+    if _ACLIENT is not None:
+        await _ACLIENT.aclose()
+        _ACLIENT = None